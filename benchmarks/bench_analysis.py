@@ -0,0 +1,195 @@
+'''Time and memory of every analysis cell at growing data sizes
+
+Usage: python benchmarks/bench_analysis.py [--scales 1 1000 100000]
+                                           [--output results.json]
+
+Synthetic manifests are drawn from titanic-data.csv by sampling whole
+passengers with replacement, so missing Cabins, missing Ages and the
+long Fare tail show up at the same rates. Each scale is written to a
+temporary CSV and every stage of the notebook is timed on its own.
+
+Timings run without tracemalloc, which slows Python-heavy stages down
+several times. Memory is the stage's peak resident set size above
+where it started, sampled from a background thread so allocations
+made in C (the CSV parser, NumPy) count too. Memory freed by earlier
+stages is often reused without growing the RSS, so small stages can
+show zero here. A second, traced run of each stage adds tracemalloc's
+peak as a secondary figure.
+'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from titanic import features
+from titanic.survival import percent_survived
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'titanic-data.csv')
+
+SKIPPED = object() # Returned by stages too slow to run at this size
+
+
+def synthesize(titanic_data, rows, path, seed=0, chunksize=1000000):
+    '''Writes `rows` passengers sampled from `titanic_data` to `path`'''
+    random = np.random.RandomState(seed)
+    with open(path, 'w') as f:
+        for start in range(0, rows, chunksize):
+            size = min(chunksize, rows - start)
+            chunk = titanic_data.iloc[random.randint(len(titanic_data), size=size)]
+            chunk = chunk.assign(PassengerId=np.arange(start + 1, start + size + 1))
+            chunk.to_csv(f, index=False, header=start == 0)
+
+
+def current_rss():
+    '''Returns the resident set size in bytes, or the peak so far
+    where /proc isn't available'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (IOError, OSError):
+        scale = 1 if sys.platform == 'darwin' else 1024 # ru_maxrss is KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class RssSampler(threading.Thread):
+    '''Samples the resident set size until stopped, keeping the peak'''
+
+    def __init__(self, interval=0.001):
+        super(RssSampler, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.start_rss = self.peak = current_rss()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak - self.start_rss
+
+
+def measure(func):
+    '''Returns (result, seconds, peak RSS growth in bytes) of `func()`'''
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    return result, seconds, sampler.stop()
+
+
+def traced_peak(func):
+    '''Returns tracemalloc's peak in bytes while running `func()`'''
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stages(path, max_apply_rows):
+    '''Yields (name, func) for each stage, in notebook order. Later
+    stages reuse what earlier ones return through `state`'''
+    state = {}
+
+    def load():
+        state['data'] = pd.read_csv(path)
+
+    def apply_stage(func):
+        def run():
+            if len(state['data']) > max_apply_rows:
+                return SKIPPED
+            func()
+        return run
+
+    def derive():
+        data = state['data']
+        state['data'] = data.assign(MWCh=features.mwch(data), Deck=features.deck(data['Cabin']))
+
+    yield 'load', load
+    yield 'null_counts', lambda: state['data'].isnull().sum()
+    yield 'to_mwch_apply', apply_stage(lambda: state['data'].apply(features.to_mwch, axis=1))
+    yield 'to_deck_apply', apply_stage(lambda: state['data']['Cabin'].apply(features.to_deck))
+    yield 'mwch_deck_vectorized', derive
+    for group in ['Sex', 'MWCh', 'Pclass', 'Deck']:
+        yield ('percent_survived_' + group,
+               lambda group=group: percent_survived(group, state['data']))
+    yield 'fare_describe', lambda: state['data']['Fare'].describe()
+    yield 'fare_quantile_90', lambda: state['data']['Fare'].quantile(0.90)
+    yield 'pivot_pclass', lambda: state['data'].pivot(columns='Pclass', values='Fare')
+    yield 'pivot_deck', lambda: state['data'].pivot(columns='Deck', values='Fare')
+    yield 'groupby_median', lambda: (state['data'].groupby(['Embarked', 'Pclass'])
+                                                  ['Fare'].median()
+                                                  .unstack(level=1))
+
+
+def run(scales, max_apply_rows, trace=True):
+    titanic_data = pd.read_csv(DATA)
+    results = []
+    for scale in scales:
+        rows = len(titanic_data) * scale
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        try:
+            synthesize(titanic_data, rows, path)
+            for name, func in stages(path, max_apply_rows):
+                result, seconds, rss = measure(func)
+                skipped = result is SKIPPED
+                traced = traced_peak(func) if trace and not skipped else None
+                results.append({'scale': scale, 'rows': rows, 'stage': name,
+                                'seconds': None if skipped else seconds,
+                                'peak_rss_bytes': None if skipped else rss,
+                                'tracemalloc_peak_bytes': traced,
+                                'skipped': skipped})
+                print("{:>7}x {:<26} {}".format(
+                    scale, name, 'skipped' if skipped else
+                    "{:9.4f}s {:10.1f} MiB RSS".format(seconds, rss / 2 ** 20)),
+                    file=sys.stderr)
+        finally:
+            os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 1000],
+                        help='multiples of the 891 passengers (use 100000 for the full run)')
+    parser.add_argument('--max-apply-rows', type=int, default=10 ** 7,
+                        help='skip the row-wise apply stages above this many rows')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help="skip the second, traced run of each stage")
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': run(args.scales, args.max_apply_rows, not args.no_tracemalloc),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
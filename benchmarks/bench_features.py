@@ -0,0 +1,48 @@
+'''Compare the vectorized MWCh and Deck columns to the apply-based ones
+
+Usage: python benchmarks/bench_features.py [copies]
+
+The passenger data is repeated `copies` times (default 1000)
+to get closer to the size of a full manifest.
+'''
+
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from titanic import features
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'titanic-data.csv')
+
+
+def best_of(func, repeat=3):
+    '''Returns the fastest of `repeat` runs of `func` in seconds'''
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(copies=1000):
+    titanic_data = pd.read_csv(DATA)
+    big = pd.concat([titanic_data] * copies, ignore_index=True)
+    print("Rows: {}".format(len(big)))
+
+    # Results have to match before the timings mean anything
+    assert (big.apply(features.to_mwch, axis=1).astype(object)
+               .equals(features.mwch(big).astype(object)))
+    assert (big['Cabin'].apply(features.to_deck).astype(object)
+                        .equals(features.deck(big['Cabin']).astype(object)))
+
+    cases = [
+        ('MWCh apply', lambda: big.apply(features.to_mwch, axis=1)),
+        ('MWCh vectorized', lambda: features.mwch(big)),
+        ('Deck apply', lambda: big['Cabin'].apply(features.to_deck)),
+        ('Deck vectorized', lambda: features.deck(big['Cabin'])),
+    ]
+    for name, func in cases:
+        print("{:<16} {:8.4f}s".format(name, best_of(func)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
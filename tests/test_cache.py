@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from titanic.cache import Cache, identity
+
+DATA = 'titanic-data.csv'
+
+
+def define(source):
+    '''Returns the namespace of `source` run as if it were a module'''
+    namespace = {'np': np, '__name__': 'transforms'}
+    exec(source, namespace)
+    return namespace
+
+
+def test_called_function_changes_identity():
+    before = define('def f(x): return np.mean(x)')['f']
+    after = define('def f(x): return np.median(x)')['f']
+    assert identity(before) != identity(after)
+
+
+def test_edited_callee_invalidates_entry(tmpdir):
+    cache = Cache(str(tmpdir))
+    fares = cache.read_csv(DATA, usecols=['Fare'])
+    transforms = define('def summary(df): return df["Fare"].mean()\n'
+                        'def report(df): return summary(df)')
+    first = cache.compute(transforms['report'], [fares])
+    assert np.isclose(first.value, pd.read_csv(DATA)['Fare'].mean())
+
+    exec('def summary(df): return df["Fare"].max()', transforms) # Only the callee changes
+    second = cache.compute(transforms['report'], [fares])
+    assert second.key != first.key
+    assert second.value == pd.read_csv(DATA)['Fare'].max()
+
+
+def test_captured_value_invalidates_entry(tmpdir):
+    cache = Cache(str(tmpdir))
+    fares = cache.read_csv(DATA, usecols=['Fare'])
+
+    def above(limit):
+        return lambda df: int((df['Fare'] > limit).sum())
+
+    low = cache.compute(above(10), [fares])
+    high = cache.compute(above(100), [fares])
+    assert low.key != high.key
+    assert low.value > high.value
+    assert cache.compute(above(10), [fares]).key == low.key
+
+
+def test_unchanged_transform_hits_without_parsing(tmpdir):
+    cache = Cache(str(tmpdir))
+    cache.compute(lambda df: df['Sex'].value_counts(), [cache.read_csv(DATA)]).value
+
+    again = Cache(str(tmpdir))
+    raw = again.read_csv(DATA)
+    counts = again.compute(lambda df: df['Sex'].value_counts(), [raw])
+    assert counts.value['male'] == 577
+    assert not raw.loaded
+
+
+def test_module_constant_changes_identity():
+    from titanic import features
+    from titanic.stream import with_derived
+    before = identity(features.mwch), identity(with_derived)
+    age = features.CHILD_AGE
+    try:
+        features.CHILD_AGE = age - 1
+        after = identity(features.mwch), identity(with_derived)
+    finally:
+        features.CHILD_AGE = age
+    assert before[0] != after[0]
+    assert before[1] != after[1]
+    assert identity(features.mwch) == before[0]
+
+
+def test_class_method_changes_identity():
+    before = define('class Fares(object):\n'
+                    '    def summary(self, df): return df["Fare"].mean()\n'
+                    'def report(df): return Fares().summary(df)')['report']
+    after = define('class Fares(object):\n'
+                   '    def summary(self, df): return df["Fare"].max()\n'
+                   'def report(df): return Fares().summary(df)')['report']
+    assert identity(before) != identity(after)
+
+
+def test_range_index_round_trips(tmpdir):
+    cache = Cache(str(tmpdir))
+    raw = cache.read_csv(DATA)
+    for transform in [lambda df: df.tail(5), lambda df: df.iloc[::2]]:
+        cache.compute(transform, [raw]).value
+        again = Cache(str(tmpdir)).compute(transform, [Cache(str(tmpdir)).read_csv(DATA)])
+        expected = transform(pd.read_csv(DATA))
+        assert again.value.index.equals(expected.index)
+        assert again.value.equals(expected)
+
+
+def test_unnamed_series_round_trips(tmpdir):
+    cache = Cache(str(tmpdir))
+    cache.compute(lambda df: df.isnull().sum(), [cache.read_csv(DATA)]).value
+    again = Cache(str(tmpdir))
+    nulls = again.compute(lambda df: df.isnull().sum(), [again.read_csv(DATA)])
+    expected = pd.read_csv(DATA).isnull().sum()
+    assert nulls.value.name is None
+    assert nulls.value.equals(expected)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from titanic import features
+from titanic.incremental import AggregateStore
+from titanic.stream import SURVIVAL_GROUPS
+from titanic.survival import percent_survived
+
+DATA = 'titanic-data.csv'
+
+
+@pytest.fixture(scope='module')
+def titanic_data():
+    return pd.read_csv(DATA)
+
+
+@pytest.fixture(scope='module', params=[1, 2, 7])
+def store(request, titanic_data, tmpdir_factory):
+    '''A store fed `param` batches, saved and reloaded after each one'''
+    path = str(tmpdir_factory.mktemp('state').join('state.json'))
+    for number, rows in enumerate(np.array_split(np.arange(len(titanic_data)), request.param)):
+        store = AggregateStore.load(path) if number else AggregateStore()
+        store.update(titanic_data.iloc[rows])
+        store.save(path)
+    return AggregateStore.load(path)
+
+
+def test_null_counts(store, titanic_data):
+    pd.testing.assert_series_equal(store.null_counts(), titanic_data.isnull().sum())
+
+
+@pytest.mark.parametrize('group', SURVIVAL_GROUPS)
+def test_percent_survived(store, titanic_data, group):
+    with_groups = titanic_data.assign(MWCh=lambda x: x.apply(features.to_mwch, axis=1),
+                                      Deck=lambda x: x['Cabin'].apply(features.to_deck))
+    expected = percent_survived(group, with_groups)
+    result = store.survival().loc[group]
+    assert list(result.index) == list(expected.index)
+    assert list(result['Percent']) == list(expected)
+    assert result['Count'].sum() == with_groups[group].notnull().sum()
+
+
+def test_fare_medians(store, titanic_data):
+    expected = (titanic_data.groupby(['Embarked', 'Pclass'])
+                            ['Fare'].median()
+                            .unstack(level=1)
+                            .reindex(features.PORT_ORDER))
+    pd.testing.assert_frame_equal(store.fare_medians(), expected)
+
+
+def test_empty_store_saves_and_reports(tmpdir):
+    path = str(tmpdir.join('state.json'))
+    AggregateStore().save(path)
+    store = AggregateStore.load(path)
+    store.save(path)
+    assert store.rows == 0
+    assert store.null_counts().empty
+    assert store.survival().empty
+    assert store.fare_medians().isnull().all().all()
+    assert store.fare_counts().empty
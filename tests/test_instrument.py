@@ -0,0 +1,61 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from titanic.instrument import PipeRecorder
+
+MIB = 2 ** 20
+
+
+def allocate(df):
+    np.ones(16 * MIB // 8).sum() # 16 MiB that is freed straight away
+    return df
+
+
+def test_peak_is_per_step_under_outer_trace():
+    recorder = PipeRecorder(memory=True)
+    df = pd.DataFrame({'Fare': np.arange(1000.0)})
+    tracemalloc.start()
+    try:
+        (df.pipe(recorder.step(allocate))
+           .pipe(recorder.step(lambda x: x.head(), 'head')))
+    finally:
+        tracemalloc.stop()
+    allocated, head = recorder.records
+    assert allocated['peak_bytes'] >= 16 * MIB
+    assert head['peak_bytes'] < MIB
+    assert (head['rows_in'], head['rows_out']) == (1000, 5)
+
+
+def test_failed_step_is_recorded_and_tracing_stops():
+    recorder = PipeRecorder(memory=True)
+
+    def fail(df):
+        raise ValueError('bad step')
+
+    with pytest.raises(ValueError):
+        pd.DataFrame({'Fare': [1.0]}).pipe(recorder.step(fail))
+    assert not tracemalloc.is_tracing()
+    assert recorder.records[0]['error'] == "ValueError('bad step')"
+    assert 'error' in recorder.report()
+
+
+def test_nested_step_peak_counts_for_outer_step():
+    recorder = PipeRecorder(memory=True)
+    inner = recorder.step(allocate, 'inner')
+    outer = recorder.step(lambda df: inner(df), 'outer')
+    outer(pd.DataFrame({'Fare': [1.0]}))
+    records = {record['step']: record for record in recorder.records}
+    assert records['outer']['peak_bytes'] >= records['inner']['peak_bytes'] >= 16 * MIB
+
+
+def test_time_is_untraced_by_default():
+    recorder = PipeRecorder()
+    pd.DataFrame({'Fare': [1.0, 2.0]}).pipe(recorder.step(allocate))
+    assert not tracemalloc.is_tracing()
+    record, = recorder.records
+    assert record['peak_bytes'] is None
+    assert record['rows_out'] == 2
+    assert '-' in recorder.report().splitlines()[1]
@@ -0,0 +1,12 @@
+'''Reusable pieces of the Titanic dataset analysis
+
+Importing the package only loads NumPy and pandas. matplotlib is
+imported when a figure is actually drawn, so aggregate-only jobs
+never pay for the plotting stack.
+
+Run `python -m titanic --help` for the command line interface.
+'''
+
+from .fares import fare_medians, fare_summary, grouped_boxstats
+from .features import DECK_ORDER, PORT_ORDER, deck, mwch, to_deck, to_mwch
+from .survival import percent_survived, survival_table
@@ -0,0 +1,158 @@
+'''Bootstrap confidence intervals for survival rates and median fares
+
+Resampling passengers with replacement only changes how many times
+each kind of passenger is drawn. So instead of resampling rows, each
+replicate draws multinomial counts over the cells of a table, e.g.
+(Sex, Survived) or (Embarked, Pclass, Fare). That is the same
+bootstrap, but its cost depends on the number of cells, not rows:
+two per group for survival rates, and at most `bins` per group for
+median fares (see `median_intervals`).
+
+Replicates are drawn in fixed-size batches, each with its own child
+seed, so the results depend only on `seed` and not on how many
+processes shared the work.
+'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .survival import survival_table
+
+# Keep each batch's (replicates x cells) array to about this many values
+BATCH_VALUES = 10 ** 7
+
+
+def draw(seed, counts, size):
+    '''Returns `size` multinomial resamples of `counts`, one per row'''
+    random = np.random.default_rng(seed)
+    total = int(counts.sum())
+    return random.multinomial(total, counts / total, size=size)
+
+
+def rate_batch(args):
+    '''Returns survival rates of each group in `size` replicates
+
+    `counts` holds (died, survived) pairs for each group in turn.
+    '''
+    seed, counts, size = args
+    cells = draw(seed, counts, size).reshape(size, -1, 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cells[:, :, 1] / cells.sum(axis=2) # NaN when a group wasn't drawn
+
+
+def median_batch(args):
+    '''Returns the median fare of each group in `size` replicates
+
+    `counts` and `fares` run through the groups in turn, with each
+    group's fares sorted. `bounds` marks where each group starts.
+    '''
+    seed, counts, fares, bounds, size = args
+    totals = np.cumsum(draw(seed, counts, size), axis=1)
+    totals = np.concatenate([np.zeros((size, 1), dtype=totals.dtype), totals], axis=1)
+    medians = np.full((size, len(bounds) - 1), np.nan)
+    for group, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        within = totals[:, start + 1:stop + 1] - totals[:, [start]] # Running count inside the group
+        drawn = within[:, -1]
+        lower = (within <= ((drawn - 1) // 2)[:, None]).sum(axis=1)
+        upper = (within <= (drawn // 2)[:, None]).sum(axis=1)
+        found = drawn > 0
+        values = fares[start:stop]
+        medians[found, group] = (values[lower[found]] + values[upper[found]]) / 2
+    return medians
+
+
+def replicate(batch, payload, cells, replicates, seed, processes):
+    '''Runs `batch` over `replicates` split into batches, returning
+    all the replicates stacked into one array'''
+    size = max(1, min(replicates, BATCH_VALUES // max(cells, 1)))
+    sizes = [size] * (replicates // size) + ([replicates % size] if replicates % size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(child,) + payload + (count,) for child, count in zip(seeds, sizes)]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) == 1:
+        return np.concatenate([batch(job) for job in jobs])
+    with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+        return np.concatenate(list(pool.map(batch, jobs)))
+
+
+def interval(samples, confidence):
+    '''Returns the lower and upper percentile interval of each column'''
+    tail = (1 - confidence) / 2 * 100
+    return np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+
+
+def survival_intervals(df, groups, replicates=10000, confidence=0.95,
+                       seed=0, processes=None):
+    '''Returns `survival_table(df, groups)` with Lower and Upper
+    bootstrap bounds on each Percent'''
+    table = survival_table(df, groups)
+    survived = np.asarray(df['Survived'], dtype=np.int64)
+    lower, upper = [], []
+    for group in groups:
+        codes, values = pd.factorize(df[group], sort=True)
+        codes = np.where(codes < 0, len(values), codes) # Passengers missing this value still get drawn
+        counts = np.bincount(codes * 2 + survived, minlength=2 * (len(values) + 1))
+        rates = replicate(rate_batch, (counts,), len(counts), replicates, seed, processes)
+        bounds = interval(rates[:, :len(values)], confidence)
+        lower.extend(bounds[0])
+        upper.extend(bounds[1])
+    return table.assign(Lower=lower, Upper=upper)
+
+
+def fare_cells(fares, bins):
+    '''Returns (values, counts) of a group's sorted `fares`, with at
+    most `bins` values. Past that, each fare is snapped to the nearest
+    of `bins` quantile-spaced values of the group'''
+    values, counts = np.unique(fares, return_counts=True)
+    if len(values) <= bins:
+        return values, counts
+    grid = np.unique(sorted_quantiles(fares, (np.arange(bins) + 0.5) / bins))
+    nearest = np.searchsorted((grid[1:] + grid[:-1]) / 2, fares) # Index of the closest grid value
+    return grid, np.bincount(nearest, minlength=len(grid))
+
+
+def sorted_quantiles(values, q):
+    '''Returns the `q` quantiles of sorted `values`, interpolated'''
+    return np.interp(q * (len(values) - 1), np.arange(len(values)), values)
+
+
+def median_intervals(df, by=('Embarked', 'Pclass'), replicates=10000, confidence=0.95,
+                     seed=0, processes=None, bins=256):
+    '''Returns the median fare of each `by` group with Lower and
+    Upper bootstrap bounds, indexed like `groupby(by)['Fare'].median()`
+
+    Each group keeps at most `bins` distinct fares, so the cost is
+    bounded by groups x bins however continuous the fares are. When a
+    group has more, its intervals carry an extra rank error of about
+    1 / `bins`. Like `survival_intervals`, every passenger is resampled:
+    ones missing a `by` value or a fare just don't land in any group.
+    '''
+    by = list(by)
+    known = df[by + ['Fare']].notnull().all(axis=1)
+    data = df.loc[known, by + ['Fare']]
+    grouped = data.groupby(by, sort=True, observed=True)
+    codes = np.asarray(grouped.ngroup())
+    fares = np.asarray(data['Fare'], dtype=np.float64)
+    order = np.lexsort((fares, codes)) # Sorted by group, then fare
+    sizes = np.bincount(codes, minlength=grouped.ngroups)
+    edges = np.r_[0, np.cumsum(sizes)]
+
+    values, counts, bounds = [], [], [0]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        group_values, group_counts = fare_cells(fares[order[start:stop]], bins)
+        values.append(group_values)
+        counts.append(group_counts)
+        bounds.append(bounds[-1] + len(group_values))
+    counts.append([len(df) - len(data)]) # Drawn, but in no group
+    values = np.concatenate(values)
+    counts = np.concatenate(counts).astype(np.int64)
+
+    medians = replicate(median_batch, (counts, values, np.array(bounds)), len(counts),
+                        replicates, seed, processes)
+    lower, upper = interval(medians, confidence)
+    median = grouped['Fare'].median()
+    return pd.DataFrame({'Median': median.values, 'Lower': lower, 'Upper': upper},
+                        index=median.index, columns=['Median', 'Lower', 'Upper'])
@@ -0,0 +1,338 @@
+'''Disk cache of derived columns and aggregates
+
+Every result is stored under a key made from the hash of the input
+file and the identity of each transformation that led to it. When
+nothing upstream changed the key is the same, so the result is read
+back without parsing the CSV or recomputing anything. Changing one
+transformation changes its key and the keys of everything built on
+it, and nothing else.
+
+    cache = Cache('.cache')
+    raw = cache.read_csv('titanic-data.csv')
+    data = cache.compute(with_derived, [raw])
+    table = cache.compute(survival_table, [data], ['Sex', 'Pclass'])
+    table.value
+
+DataFrames and Series are stored one .npy file per column. Anything
+else is pickled. Once the cache grows past `max_bytes` the least
+recently used entries are removed.
+'''
+
+import functools
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import sysconfig
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+INDEX = 'index.json'
+
+
+def file_hash(path, block=1 << 20):
+    '''Returns the sha256 of the contents of `path`'''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Code installed here belongs to libraries, which change with their version
+LIBRARY_PATHS = tuple(sorted(set(sysconfig.get_paths()[name]
+                                 for name in ('stdlib', 'platstdlib', 'purelib', 'platlib'))))
+
+
+def is_library(module):
+    path = getattr(module, '__file__', None) or ''
+    return bool(path) and os.path.abspath(path).startswith(LIBRARY_PATHS)
+
+
+def library_token(func):
+    '''Names a library function along with its library's version'''
+    module = getattr(func, '__module__', None) or ''
+    root = sys.modules.get(module.split('.')[0])
+    return '{}.{}@{}'.format(module, func.__qualname__,
+                             getattr(root, '__version__', ''))
+
+
+def token(value, seen):
+    '''Returns a string standing for `value` that only changes when
+    its contents (or, for functions, its code) change'''
+    if isinstance(value, functools.partial):
+        return 'partial({},{},{})'.format(token(value.func, seen), token(value.args, seen),
+                                          token(value.keywords, seen))
+    if hasattr(value, '__code__'):
+        return function_hash(value, seen)
+    if isinstance(value, (list, tuple)):
+        return '({})'.format(','.join(token(item, seen) for item in value))
+    if isinstance(value, dict):
+        return '{{{}}}'.format(','.join('{}:{}'.format(token(key, seen), token(item, seen))
+                                        for key, item in sorted(value.items(), key=repr)))
+    if isinstance(value, types.ModuleType):
+        return 'module:' + value.__name__
+    if isinstance(value, np.ndarray):
+        return 'array:{}:{}:{}'.format(value.dtype, value.shape,
+                                       hashlib.sha256(np.ascontiguousarray(value).tobytes())
+                                              .hexdigest())
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return 'pandas:{}:{}'.format(repr(getattr(value, 'columns', value.name)),
+                                     hashlib.sha256(pd.util.hash_pandas_object(value).values
+                                                    .tobytes()).hexdigest())
+    if isinstance(value, type) and not is_library(sys.modules.get(value.__module__)):
+        return class_hash(value, seen)
+    if hasattr(value, '__qualname__'): # Builtins, library classes and other code without __code__
+        return library_token(value)
+    if type(value).__repr__ is object.__repr__: # Would print its address
+        return 'object:{}:{}'.format(token(type(value), seen),
+                                     token(getattr(value, '__dict__', {}), seen))
+    return repr(value)
+
+
+def class_hash(cls, seen):
+    '''Hashes a class's bases, methods and class attributes'''
+    name = '{}.{}'.format(cls.__module__, cls.__qualname__)
+    if id(cls) in seen:
+        return name
+    seen.add(id(cls))
+    parts = [name, token(cls.__bases__, seen)]
+    for attribute, value in sorted(vars(cls).items()):
+        if attribute in ('__dict__', '__weakref__', '__module__', '__doc__'):
+            continue
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        elif isinstance(value, property):
+            value = [value.fget, value.fset, value.fdel]
+        parts.append('{}={}'.format(attribute, token(value, seen)))
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def code_hash(code, namespace, seen):
+    '''Hashes a code object, the functions nested in it and the
+    module-level names it refers to: functions, classes and constants'''
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr(code.co_names).encode()) # np.mean and np.median differ only here
+    for const in code.co_consts:
+        digest.update(code_hash(const, namespace, seen).encode() if hasattr(const, 'co_code')
+                      else repr(const).encode())
+    for name in code.co_names:
+        if name not in namespace: # Builtins and attribute names
+            continue
+        value = namespace[name]
+        if isinstance(value, types.ModuleType):
+            if is_library(value):
+                continue
+            module = value # features.mwch, features.CHILD_AGE: follow the attributes used
+            value = [getattr(module, attribute) for attribute in code.co_names
+                     if hasattr(module, attribute) and
+                     not isinstance(getattr(module, attribute), types.ModuleType)]
+        digest.update('{}={}'.format(name, token(value, seen)).encode())
+    return digest.hexdigest()
+
+
+def function_hash(func, seen):
+    '''Hashes a function's code, defaults, closure and callees'''
+    if is_library(sys.modules.get(func.__module__ or '')):
+        return library_token(func)
+    name = '{}.{}'.format(func.__module__, func.__qualname__)
+    if id(func) in seen:
+        return name # Recursion; the rest is hashed further up
+    seen.add(id(func))
+    closure = [cell.cell_contents for cell in func.__closure__ or ()]
+    parts = [name, code_hash(func.__code__, func.__globals__, seen),
+             token(func.__defaults__, seen), token(func.__kwdefaults__, seen),
+             token(closure, seen)]
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def identity(func):
+    '''Returns a string naming `func` and hashing its code, defaults,
+    captured values and the functions it calls, so editing any of them
+    gives the transformation a new identity
+
+    Callees, classes and constants are followed when they are referred
+    to by a module-level name, directly or as an attribute of an
+    imported module. Library functions count by name and library
+    version.
+    '''
+    return token(func, set())
+
+
+def save_frame(frame, directory):
+    '''Writes a DataFrame as one .npy file per column'''
+    is_series = isinstance(frame, pd.Series)
+    if is_series:
+        named = frame.name is not None
+        frame = frame.to_frame() # An unnamed Series becomes column 0
+    index_names = list(frame.index.names)
+    is_range = isinstance(frame.index, pd.RangeIndex)
+    flat = frame.reset_index(drop=is_range)
+    columns = []
+    for number, (label, column) in enumerate(flat.items()):
+        info = {'label': label if number >= len(flat.columns) - len(frame.columns)
+                else None,
+                'dtype': str(column.dtype)}
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            info['categories'] = column.cat.categories.tolist()
+            values = np.asarray(column.cat.codes)
+        elif column.dtype.kind in 'biufcmM':
+            values = np.asarray(column)
+        else:
+            values = np.asarray(column, dtype=object) # Strings, mixed values
+        np.save(os.path.join(directory, '{}.npy'.format(number)), values,
+                allow_pickle=values.dtype == object)
+        columns.append(info)
+    meta = {'series': is_series,
+            'named': is_series and named,
+            'index': None if is_range else index_names,
+            'range': ([frame.index.start, frame.index.stop, frame.index.step, frame.index.name]
+                      if is_range else None), # df.tail(5) doesn't start at 0
+            'columns_name': frame.columns.name,
+            'columns': columns}
+    with open(os.path.join(directory, 'frame.json'), 'w') as f:
+        json.dump(meta, f, default=lambda value: value.item()) # numpy scalars as labels
+
+
+def load_frame(directory):
+    '''Reads back what `save_frame` wrote'''
+    with open(os.path.join(directory, 'frame.json')) as f:
+        meta = json.load(f)
+    data = {}
+    for number, info in enumerate(meta['columns']):
+        values = np.load(os.path.join(directory, '{}.npy'.format(number)),
+                         allow_pickle=True)
+        if 'categories' in info:
+            data[number] = pd.Categorical.from_codes(values, info['categories'])
+        else:
+            data[number] = pd.Series(values).astype(info['dtype'])
+    frame = pd.DataFrame(data)
+    levels = len(meta['index'] or [])
+    if levels:
+        frame = frame.set_index(list(range(levels)))
+        frame.index.names = meta['index']
+    elif meta.get('range'):
+        start, stop, step, name = meta['range']
+        frame.index = pd.RangeIndex(start, stop, step, name=name)
+    frame.columns = pd.Index([info['label'] for info in meta['columns'][levels:]],
+                             name=meta['columns_name'])
+    if not meta['series']:
+        return frame
+    series = frame.iloc[:, 0]
+    if not meta.get('named', True):
+        series.name = None
+    return series
+
+
+class Cached(object):
+    '''A cache key and a lazily loaded value'''
+
+    def __init__(self, key, load):
+        self.key = key
+        self.load = load
+        self.loaded = False
+
+    @property
+    def value(self):
+        if not self.loaded:
+            self.result = self.load()
+            self.loaded = True
+        return self.result
+
+
+class Cache(object):
+    '''Content-addressed store of results in `directory`'''
+
+    def __init__(self, directory='.cache', max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, INDEX)
+        self.index = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.index = json.load(f) # key -> {'size': bytes, 'used': timestamp}
+
+    def save_index(self):
+        with open(os.path.join(self.directory, INDEX), 'w') as f:
+            json.dump(self.index, f)
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, key):
+        return key in self.index and os.path.isdir(self.path(key))
+
+    def get(self, key):
+        '''Returns the stored value for `key`, marking it recently used'''
+        path = self.path(key)
+        if os.path.exists(os.path.join(path, 'frame.json')):
+            value = load_frame(path)
+        else:
+            with open(os.path.join(path, 'value.pickle'), 'rb') as f:
+                value = pickle.load(f)
+        self.index[key]['used'] = time.time()
+        self.save_index()
+        return value
+
+    def put(self, key, value):
+        '''Stores `value` under `key` and evicts old entries if needed'''
+        path = self.path(key)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            save_frame(value, path)
+        else:
+            with open(os.path.join(path, 'value.pickle'), 'wb') as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        self.index[key] = {'size': size, 'used': time.time()}
+        self.evict(keep=key)
+        self.save_index()
+
+    def evict(self, keep=None):
+        '''Removes least recently used entries until under `max_bytes`'''
+        total = sum(entry['size'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda key: self.index[key]['used']):
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                total -= self.index.pop(key)['size']
+                shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def fetch(self, key, compute):
+        '''Returns a `Cached` for `key`, running `compute` on a miss'''
+        def load():
+            if key in self:
+                return self.get(key)
+            value = compute()
+            self.put(key, value)
+            return value
+        return Cached(key, load)
+
+    def read_csv(self, path, **kwargs):
+        '''Returns a `Cached` DataFrame of the CSV at `path`, keyed by
+        the file's contents so it is only parsed once'''
+        key = self.key('read_csv', [file_hash(path)], (), kwargs)
+        return self.fetch(key, lambda: pd.read_csv(path, **kwargs))
+
+    def key(self, name, inputs, args, kwargs):
+        parts = [name] + list(inputs) + [token(args, set()), token(kwargs, set())]
+        return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+    def compute(self, func, inputs, *args, **kwargs):
+        '''Returns a `Cached` result of `func(*input values, *args, **kwargs)`
+
+        `inputs` are other `Cached` results. Their values are only
+        loaded if this result isn't already in the cache.
+        '''
+        key = self.key(identity(func), [cached.key for cached in inputs], args, kwargs)
+        return self.fetch(key, lambda: func(*([cached.value for cached in inputs] + list(args)),
+                                            **kwargs))
@@ -0,0 +1,104 @@
+'''Command line interface: python -m titanic <command> [options]
+
+    convert   write a columnar copy of the data that loads faster
+    survival  percent of survivors by Sex, MWCh, Pclass and Deck
+    nulls     number of rows and missing values in each column
+    fares     fare statistics and median fares by port and class
+    figures   regenerate the charts in figures/
+'''
+
+import argparse
+import os
+
+import pandas as pd
+
+from . import columnar
+from .fares import fare_medians, fare_summary
+from .stream import SURVIVAL_GROUPS, with_derived
+from .survival import survival_table
+
+
+# Columns each report reads from a converted copy
+FARE_COLUMNS = ['Fare', 'Embarked', 'Pclass']
+FIGURE_COLUMNS = ['Survived', 'Sex', 'Age', 'Pclass', 'Deck', 'Fare', 'Embarked']
+
+
+def survival_columns(args):
+    columns = ['Survived']
+    for group in args.groups:
+        for column in (['Age', 'Sex'] if group == 'MWCh' else [group]): # MWCh is derived
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def convert(args):
+    columnar.convert(args.csv, args.output)
+
+
+def survival(titanic_data, args):
+    print(survival_table(with_derived(titanic_data, args.groups), args.groups))
+
+
+def nulls(titanic_data, args):
+    print("Number of rows: {}".format(len(titanic_data)))
+    print(titanic_data.isnull().sum())
+
+
+def fares(titanic_data, args):
+    print(fare_summary(titanic_data['Fare']))
+    print()
+    print(fare_medians(titanic_data))
+
+
+def figures(titanic_data, args):
+    from .figures import compute_aggregates, render_all # Only this command needs matplotlib
+    for saved in render_all(compute_aggregates(titanic_data), args.output,
+                            processes=args.processes):
+        print(saved)
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog='python -m titanic',
+                                     description='Analysis of the Titanic dataset')
+    parser.add_argument('--csv', default='titanic-data.csv',
+                        help='passenger data, as a CSV or a directory written '
+                             'by the convert command (default: titanic-data.csv)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser('convert', help='write a columnar copy of --csv')
+    command.add_argument('output', help='directory for the columns')
+    command.set_defaults(run=convert, raw=True)
+
+    command = commands.add_parser('survival', help='percent of survivors by group')
+    command.add_argument('groups', nargs='*', default=SURVIVAL_GROUPS,
+                         help='columns to group by (default: {})'.format(
+                             ' '.join(SURVIVAL_GROUPS)))
+    command.set_defaults(run=survival, columns=survival_columns)
+
+    command = commands.add_parser('nulls', help='missing values in each column')
+    command.set_defaults(run=nulls, columns=None) # Needs every column of the CSV
+
+    command = commands.add_parser('fares', help='fare statistics')
+    command.set_defaults(run=fares, columns=lambda args: FARE_COLUMNS)
+
+    command = commands.add_parser('figures', help='regenerate the charts')
+    command.add_argument('--output', default='figures', help='directory for the images')
+    command.add_argument('--processes', type=int, help='charts drawn at once')
+    command.set_defaults(run=figures, columns=lambda args: FIGURE_COLUMNS)
+    return parser
+
+
+def main(argv=None):
+    arguments = parser()
+    args = arguments.parse_args(argv)
+    if getattr(args, 'raw', False):
+        args.run(args)
+    elif not os.path.isdir(args.csv):
+        args.run(pd.read_csv(args.csv), args)
+    elif args.columns is None:
+        arguments.error("{} needs the original CSV: a converted copy leaves out "
+                        "Name, Ticket and Cabin".format(args.command))
+    else:
+        args.run(columnar.load(args.csv, args.columns(args)), args) # Only map what's used
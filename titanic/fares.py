@@ -0,0 +1,86 @@
+'''Fare reports from Part II
+
+`grouped_boxstats` works out box plot statistics for each group
+straight from the long Fare column. The notebook reshapes with
+`pivot(columns=..., values='Fare')` first, which builds a mostly-NaN
+frame with one column per group just to feed `.plot(kind='box')`.
+'''
+
+import numpy as np
+import pandas as pd
+
+from . import features
+
+
+def fare_summary(fares):
+    '''Returns `fares.describe()` with the 90th percentile added,
+    which is where the notebook cuts off its histogram'''
+    return pd.concat([fares.describe(),
+                      pd.Series([fares.quantile(0.90)], index=['90%'])]).rename(fares.name)
+
+
+def fare_medians(df):
+    '''Returns the median fare for each port of embarkation (rows,
+    in the order the Titanic stopped at them) and class (columns)'''
+    return (df.groupby(['Embarked', 'Pclass']) # Split fares by port and class
+              ['Fare'].median()
+              .unstack(level=1)                # Class to columns
+              .reindex(features.PORT_ORDER))   # Chronological order
+
+
+def sorted_quantile(values, q):
+    '''Returns the `q` quantile(s) of already sorted `values`,
+    interpolated the same way as `np.percentile`'''
+    position = np.asarray(q) * (len(values) - 1)
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, len(values) - 1)
+    return values[below] + (values[above] - values[below]) * (position - below)
+
+
+def boxstats(values, label, whis=1.5):
+    '''Returns `matplotlib.axes.Axes.bxp` statistics of sorted `values`
+
+    Follows `matplotlib.cbook.boxplot_stats`, which is what
+    `.plot(kind='box')` uses under the hood.
+    '''
+    q1, med, q3 = sorted_quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    low = values[values >= q1 - whis * iqr]
+    high = values[values <= q3 + whis * iqr]
+    whislo = low[0] if len(low) and low[0] <= q1 else q1
+    whishi = high[-1] if len(high) and high[-1] >= q3 else q3
+    notch = 1.57 * iqr / np.sqrt(len(values))
+    return {'label': label, 'mean': values.mean(), 'iqr': iqr,
+            'q1': q1, 'med': med, 'q3': q3,
+            'cilo': med - notch, 'cihi': med + notch,
+            'whislo': whislo, 'whishi': whishi,
+            'fliers': values[(values < whislo) | (values > whishi)]}
+
+
+def grouped_boxstats(df, by, values='Fare', order=None, whis=1.5):
+    '''Returns a list of `bxp` statistics of `values` for each `by` group
+
+    The column is sorted once by group and value, and every group's
+    statistics come from its own slice, so memory stays proportional
+    to the number of rows. `order` picks and orders the groups.
+    '''
+    data = np.asarray(df[values], dtype=np.float64)
+    codes, keys = pd.factorize(df[by], sort=True)
+    known = (codes >= 0) & ~np.isnan(data)                # Same rows .plot(kind='box') keeps
+    codes, data = codes[known], data[known]
+    data = data[np.lexsort((data, codes))]                # Sorted by group, then by value
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(keys)))])
+
+    slices = {key: data[bounds[code]:bounds[code + 1]] for code, key in enumerate(keys)}
+    return [boxstats(slices[key], key, whis)
+            for key in (keys if order is None else order)
+            if key in slices and len(slices[key])]
+
+
+def plot_boxstats(stats, ax=None, showfliers=True):
+    '''Draws precomputed box plot `stats` and returns the Axes'''
+    if ax is None:
+        import matplotlib.pyplot as plt # Only needed when drawing
+        ax = plt.gca()
+    ax.bxp(stats, showfliers=showfliers)
+    return ax
@@ -0,0 +1,63 @@
+'''Derived columns used throughout the analysis
+
+The notebook builds MWCh and Deck with row-wise `apply` calls.
+The functions here give the same answers using whole-column
+operations, so they stay fast on much longer passenger manifests.
+'''
+
+import numpy as np
+import pandas as pd
+
+# Order the decks from top to bottom, with 'No Info' showing last
+DECK_ORDER = list('TABCDEFG') + ['No Info']
+
+# Ports in the order the Titanic stopped at them
+PORT_ORDER = list('SCQ')
+
+# I figure once someone hits their teens,
+# they aren't a child anymore.
+CHILD_AGE = 14
+
+
+def to_mwch(df):
+    '''Returns whether a passenger is a child
+    and if not, just returns the gender of the passenger'''
+
+    if df['Age'] < CHILD_AGE:
+        return 'child'
+    else:
+        return df['Sex'] # Missing age values are also included here
+
+
+def to_deck(cabin):
+    '''Return the deck letter of
+    a given cabin. It is just the first letter
+    of the cabin number'''
+
+    if pd.isnull(cabin):
+        return 'No Info'
+    else:
+        return cabin[0]
+
+
+def mwch(df):
+    '''Returns the Man, Woman, Child column for every passenger at once
+
+    Same rules as `to_mwch`: anyone under 14 is a child and everyone
+    else, including passengers with a missing age, gets their sex.
+    '''
+    is_child = np.asarray(df['Age'] < CHILD_AGE) # NaN < 14 is False, so missing ages fall back to Sex
+    labels = np.where(is_child, 'child', np.asarray(df['Sex'], dtype=object))
+    return pd.Series(pd.Categorical(labels), index=df.index, name='MWCh')
+
+
+def deck(cabin):
+    '''Returns the deck letter of every cabin in the `cabin` Series
+
+    Same rules as `to_deck`. Cabin numbers repeat a lot, so only
+    the distinct ones are sliced before mapping back to each row.
+    '''
+    codes, uniques = pd.factorize(cabin)            # Each distinct cabin once
+    letters = pd.Series(uniques).str[0].fillna('No Info')
+    letters = np.append(np.asarray(letters, dtype=object), 'No Info') # Code -1 (missing) picks the last entry
+    return pd.Series(pd.Categorical(letters[codes]), index=cabin.index, name='Deck')
@@ -0,0 +1,185 @@
+'''Headless rendering of every chart in figures/
+
+All the numbers a chart needs are worked out once by
+`compute_aggregates`. Each chart then draws on its own Figure with
+the Agg backend, so `render_all` can hand them to separate processes
+and finish in about the time of the slowest one.
+
+Usage: python -m titanic.figures [titanic-data.csv] [figures]
+'''
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import features
+from .fares import fare_medians, grouped_boxstats
+from .stream import with_derived
+from .survival import survival_table
+
+STYLES = ['seaborn-pastel', 'seaborn-v0_8-pastel'] # Renamed in matplotlib 3.6
+
+
+def compute_aggregates(titanic_data):
+    '''Returns everything the charts draw, keyed by name'''
+    data = with_derived(titanic_data)
+    fares = data['Fare']
+    ninetieth = fares.quantile(0.90)
+    counts, edges = np.histogram(fares[fares < ninetieth],
+                                 bins=np.arange(0, ninetieth, 10))
+    table = survival_table(data, ['Sex', 'MWCh', 'Pclass', 'Deck'])
+    return {
+        'survived': (data['Survived'].value_counts()
+                                     .rename({0: 'Died', 1: 'Survived'})),
+        'survivors_by_gender': data.loc[data['Survived'] == 1, 'Sex'].value_counts(),
+        'passengers_by_gender': data['Sex'].value_counts().sort_index(),
+        'percent_survived': {group: table.loc[group, 'Percent']
+                             for group in ['Sex', 'MWCh', 'Pclass']},
+        'percent_survived_deck': table.loc['Deck', 'Percent'].reindex(features.DECK_ORDER),
+        'fare_histogram': (counts, edges),
+        'class_boxstats': grouped_boxstats(data, 'Pclass'),
+        'deck_boxstats': grouped_boxstats(data, 'Deck', order=features.DECK_ORDER),
+        'port_medians': fare_medians(data),
+    }
+
+
+def bar(ax, series, title, rot=0):
+    '''Draws a Series as bars, like `series.plot(kind='bar')`'''
+    positions = np.arange(len(series))
+    ax.bar(positions, np.asarray(series, dtype=float), width=0.5)
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(label) for label in series.index], rotation=rot)
+    ax.set_xlabel(series.index.name or '')
+    ax.set_title(title)
+
+
+def per_survivors(fig, agg):
+    ax = fig.add_subplot(111)
+    survived = agg['survived']
+    ax.pie(survived, labels=survived.index, autopct='%.2f%%')
+    ax.set_title('Percent Survivors')
+
+
+def num_survivors_gender(fig, agg):
+    bar(fig.add_subplot(111), agg['survivors_by_gender'], 'Num Survivors by Gender')
+
+
+def num_gender(fig, agg):
+    bar(fig.add_subplot(111), agg['passengers_by_gender'], 'Num Passengers by Gender')
+
+
+def per_survivors_gender(fig, agg):
+    bar(fig.add_subplot(111), agg['percent_survived']['Sex'], '% Survivors by Gender')
+
+
+def per_survivors_mwch(fig, agg):
+    bar(fig.add_subplot(111), agg['percent_survived']['MWCh'],
+        '% Survivors by Men, Women, and Children')
+
+
+def per_survivors_class(fig, agg):
+    bar(fig.add_subplot(111), agg['percent_survived']['Pclass'], '% Survivors by Class')
+
+
+def per_survivors_deck(fig, agg):
+    bar(fig.add_subplot(111), agg['percent_survived_deck'], '% Survivors by Deck')
+
+
+def fares_bottom_90(fig, agg):
+    ax = fig.add_subplot(111)
+    counts, edges = agg['fare_histogram']
+    ax.hist(edges[:-1], bins=edges, weights=counts) # Already binned, one weighted value per bin
+    ax.grid(True)
+    ax.set_xlabel('Price (£)')
+    ax.set_ylabel('# of passengers')
+    ax.set_title('Fares of the Bottom 90%')
+
+
+def box(fig, stats, title, showfliers):
+    ax = fig.add_subplot(111)
+    ax.bxp(stats, showfliers=showfliers)
+    ax.set_ylabel('Price (£)')
+    ax.set_title(title)
+
+
+def class_price_spread_w_outliers(fig, agg):
+    box(fig, agg['class_boxstats'], 'Spread of Prices by Class (with outliers)', True)
+
+
+def class_price_spread(fig, agg):
+    box(fig, agg['class_boxstats'], 'Spread of Prices by Class', False)
+
+
+def deck_price_spread(fig, agg):
+    box(fig, agg['deck_boxstats'], 'Spread of Prices by Deck', False)
+
+
+def price_from_ports(fig, agg):
+    medians = agg['port_medians']
+    axes = fig.subplots(len(medians.columns), 1, sharex=True)
+    positions = np.arange(len(medians.index))
+    for number, (ax, pclass) in enumerate(zip(axes, medians.columns)):
+        ax.plot(positions, medians[pclass], 'C{}'.format(number), label=str(pclass))
+        ax.legend()
+    axes[-1].set_xticks(positions)
+    axes[-1].set_xticklabels(medians.index)
+    axes[-1].set_xlabel(medians.index.name)
+    fig.suptitle('Price from Ports: By Class')
+
+
+# File name -> (drawing function, figure size)
+FIGURES = {
+    'per_survivors': (per_survivors, (6, 6)),
+    'num_survivors_gender': (num_survivors_gender, None),
+    'num_gender': (num_gender, None),
+    'per_survivors_gender': (per_survivors_gender, None),
+    'per_survivors_mwch': (per_survivors_mwch, None),
+    'per_survivors_class': (per_survivors_class, None),
+    'per_survivors_deck': (per_survivors_deck, None),
+    'fares_bottom_90': (fares_bottom_90, None),
+    'class_price_spread_w_outliers': (class_price_spread_w_outliers, None),
+    'class_price_spread': (class_price_spread, None),
+    'deck_price_spread': (deck_price_spread, None),
+    'price_from_ports': (price_from_ports, (6, 6)),
+}
+
+
+def render(args):
+    '''Draws one chart and saves it, returning the file's path'''
+    name, agg, directory = args
+    import matplotlib
+    matplotlib.use('Agg') # Never needs a display
+    from matplotlib import style
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    draw, figsize = FIGURES[name]
+    styles = [choice for choice in STYLES if choice in style.available][:1]
+    with style.context(styles):
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        draw(fig, agg)
+        path = os.path.join(directory, name + '.png')
+        fig.savefig(path)
+    return path
+
+
+def render_all(agg, directory='figures', names=None, processes=None):
+    '''Renders the `names` charts (all by default) on a process pool'''
+    jobs = [(name, agg, directory) for name in (names or sorted(FIGURES))]
+    if processes == 1:
+        return [render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes or len(jobs)) as pool:
+        return list(pool.map(render, jobs))
+
+
+def main(path='titanic-data.csv', directory='figures'):
+    for saved in render_all(compute_aggregates(pd.read_csv(path)), directory):
+        print(saved)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
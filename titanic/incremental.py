@@ -0,0 +1,129 @@
+'''Survival and fare aggregates kept up to date one batch at a time
+
+`AggregateStore` holds just enough state to reproduce the notebook's
+missing-value counts, percent_survived tables and median fares by
+Embarked and Pclass. Applying a batch only touches the new rows, and
+the state is saved between runs as a small JSON file.
+
+Usage: python -m titanic.incremental state.json batch.csv [batch.csv ...]
+'''
+
+import json
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from . import features
+from .stream import SURVIVAL_GROUPS, SurvivalCounts
+
+
+def plain(value):
+    '''Turns numpy scalars into Python ones so they fit in JSON'''
+    return value.item() if hasattr(value, 'item') else value
+
+
+def counts_median(counts):
+    '''Returns the median of the values in a {value: count} mapping,
+    matching `Series.median()` of the values they stand for'''
+    values = np.array(sorted(counts))
+    ends = np.cumsum([counts[value] for value in values])
+    total = ends[-1]
+    lower = values[np.searchsorted(ends, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(ends, total // 2, side='right')]
+    return (lower + upper) / 2
+
+
+class AggregateStore(SurvivalCounts):
+    '''Append-only aggregates that always equal a full recompute
+
+    Instead of a sketch, the fares of each Embarked and Pclass pair
+    are kept as counts of each distinct fare, so medians are exact.
+    '''
+
+    def __init__(self, groups=SURVIVAL_GROUPS):
+        super(AggregateStore, self).__init__(groups)
+        self.fare_values = {} # (Embarked, Pclass) -> Counter of fares
+
+    def add_fares(self, batch):
+        known = batch.dropna(subset=['Embarked', 'Pclass', 'Fare'])
+        for key, fares in known.groupby(['Embarked', 'Pclass'], sort=False)['Fare']:
+            if len(fares): # Categorical groupers can yield empty groups
+                self.fare_values.setdefault(tuple(plain(part) for part in key), Counter()).update(
+                    fares.value_counts().to_dict())
+
+    def update(self, batch):
+        '''Folds a batch of new passenger rows into the aggregates'''
+        self.add_nulls(batch)
+        self.add_survival(batch)
+        self.add_fares(batch)
+        return self
+
+    def fare_counts(self):
+        '''Returns the number of fares behind each median'''
+        return self.by_port_class({key: sum(fares.values())
+                                   for key, fares in self.fare_values.items()},
+                                  np.int64).sort_index()
+
+    def fare_medians(self):
+        '''Returns the same table as
+        `groupby(['Embarked', 'Pclass'])['Fare'].median().unstack(level=1)`
+        with the ports in the order the Titanic stopped at them'''
+        medians = self.by_port_class({key: counts_median(fares)
+                                      for key, fares in self.fare_values.items()})
+        return medians.unstack(level=1).reindex(features.PORT_ORDER)
+
+    @staticmethod
+    def by_port_class(values, dtype=np.float64):
+        '''Returns {(Embarked, Pclass): value} as a Series, which is
+        empty when no fares were seen yet'''
+        index = pd.MultiIndex.from_tuples(list(values), names=['Embarked', 'Pclass'])
+        return pd.Series(list(values.values()), index=index, dtype=dtype)
+
+    def save(self, path):
+        '''Writes the state to `path`, replacing it in one step'''
+        state = {
+            'groups': self.groups,
+            'rows': self.rows,
+            'nulls': ([] if self.nulls is None else
+                      [[column, int(count)] for column, count in self.nulls.items()]),
+            'counts': [[group, plain(value)] + totals
+                       for (group, value), totals in self.counts.items()],
+            'fares': [[list(key), [[fare, count] for fare, count in fares.items()]]
+                      for key, fares in self.fare_values.items()],
+        }
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path) # Never leave half a state behind
+
+    @classmethod
+    def load(cls, path):
+        '''Returns the store saved at `path`'''
+        with open(path) as f:
+            state = json.load(f)
+        store = cls(state['groups'])
+        store.rows = state['rows']
+        if state['nulls']:
+            store.nulls = pd.Series(dict(state['nulls']), dtype=np.int64)[
+                [column for column, _ in state['nulls']]] # Keep the column order
+        store.counts = {(group, value): [count, survivors]
+                        for group, value, count, survivors in state['counts']}
+        store.fare_values = {tuple(key): Counter(dict(fares)) for key, fares in state['fares']}
+        return store
+
+
+def main(state, *batches):
+    store = AggregateStore.load(state) if os.path.exists(state) else AggregateStore()
+    for batch in batches:
+        store.update(pd.read_csv(batch))
+    store.save(state)
+    print("Rows: {}".format(store.rows))
+    print(store.null_counts())
+    print(store.survival())
+    print(store.fare_medians())
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,160 @@
+'''Part II fare breakdowns computed on every core
+
+The rows are split into partitions and each worker process builds a
+`FareSummary` per group. Those partial summaries merge into the same
+tables the plotting cells use: box plot statistics by Pclass and Deck
+and median fares by Embarked and Pclass. Quantiles come from the
+sketches, so they are approximate once a group outgrows the sketch.
+
+Only the four columns the breakdown needs are sent to the workers,
+which derive Deck themselves.
+With a columnar copy (`titanic.columnar`) the workers memory-map
+their own row ranges and nothing but the summaries crosses processes.
+'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import columnar, features
+from .stream import FareSummary
+
+# Every way the notebook splits up the fares
+FARE_GROUPINGS = [('Pclass',), ('Deck',), ('Embarked', 'Pclass')]
+
+# All the breakdown reads
+FARE_COLUMNS = ['Fare', 'Pclass', 'Embarked', 'Deck']
+
+# Same, before Deck is derived. The workers derive it in parallel
+SOURCE_COLUMNS = ['Fare', 'Pclass', 'Embarked', 'Cabin']
+
+
+def fare_partial(args):
+    '''Returns {(grouping, key): FareSummary} for one partition, given
+    as a DataFrame or as (directory, start, stop) of a columnar copy'''
+    seed, part, error = args
+    if isinstance(part, tuple):
+        directory, start, stop = part
+        part = columnar.load(directory, FARE_COLUMNS).iloc[start:stop]
+    if 'Deck' not in part:
+        part = part.assign(Deck=features.deck(part['Cabin']))
+    summaries = {}
+    for grouping in FARE_GROUPINGS:
+        by = list(grouping) if len(grouping) > 1 else grouping[0]
+        for key, fares in part.groupby(by, sort=False)['Fare']:
+            if len(fares): # Categorical groupers can yield empty groups
+                summaries[grouping, key] = FareSummary(error, seed=seed).update(fares)
+    return summaries
+
+
+def merge_partials(summaries, partial):
+    '''Folds one partition's summaries into the running `summaries`'''
+    for key, summary in partial.items():
+        if key in summaries:
+            summaries[key].merge(summary)
+        else:
+            summaries[key] = summary
+    return summaries
+
+
+def bounds(rows, count):
+    '''Returns (start, stop) of `count` even row partitions'''
+    edges = np.linspace(0, rows, count + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def run_partials(parts, processes, error):
+    '''Merges the `fare_partial` of every part, on a process pool
+    unless `processes` is 1'''
+    jobs = [(seed, part, error) for seed, part in enumerate(parts)]
+    summaries = {}
+    if processes == 1:
+        for job in jobs:
+            merge_partials(summaries, fare_partial(job))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for partial in pool.map(fare_partial, jobs):
+                merge_partials(summaries, partial)
+    return FareBreakdown(summaries)
+
+
+def fare_breakdown(df, processes=None, parts=None, error=0.001):
+    '''Returns a `FareBreakdown` of `df` built on `processes` cores
+
+    `parts` defaults to a few partitions per process so a slow one
+    doesn't hold up the rest. `processes=1` skips the pool entirely.
+    '''
+    processes = processes or os.cpu_count() or 1
+    df = df[FARE_COLUMNS if 'Deck' in df else SOURCE_COLUMNS] # Don't pickle Name and Ticket
+    return run_partials([df.iloc[start:stop]
+                         for start, stop in bounds(len(df), parts or processes * 4)],
+                        processes, error)
+
+
+def fare_breakdown_columnar(directory, processes=None, parts=None, error=0.001):
+    '''Returns a `FareBreakdown` of a columnar copy, with each worker
+    mapping its own rows so no data is pickled'''
+    processes = processes or os.cpu_count() or 1
+    return run_partials([(directory, start, stop) for start, stop in
+                         bounds(columnar.row_count(directory), parts or processes * 4)],
+                        processes, error)
+
+
+def sketch_boxstats(summary, label, whis=1.5):
+    '''Returns `matplotlib.axes.Axes.bxp` statistics for one group
+
+    Quartiles come from the sketch. Whiskers and fliers are picked
+    from the items the sketch kept, so they are approximate too.
+    '''
+    q1, med, q3 = summary.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    values, _ = summary.sketch.weighted_items()
+    within = (values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)
+    inside = values[within]
+    return {'label': label, 'mean': summary.mean, 'iqr': iqr,
+            'q1': q1, 'med': med, 'q3': q3,
+            'whislo': inside.min() if len(inside) else q1,
+            'whishi': inside.max() if len(inside) else q3,
+            'fliers': values[~within]}
+
+
+class FareBreakdown(object):
+    '''Merged fare summaries for every group in `FARE_GROUPINGS`'''
+
+    def __init__(self, summaries):
+        self.summaries = summaries
+
+    def groups(self, grouping):
+        '''Returns {key: FareSummary} for one grouping'''
+        grouping = tuple(grouping)
+        return {key: summary for (by, key), summary in self.summaries.items()
+                if by == grouping}
+
+    def table(self, by):
+        '''Returns count, min, median and max fare of each `by` group'''
+        groups = self.groups([by])
+        keys = sorted(groups)
+        return pd.DataFrame({'count': [groups[key].count for key in keys],
+                             'min': [groups[key].min for key in keys],
+                             'median': [groups[key].quantile(0.5) for key in keys],
+                             'max': [groups[key].max for key in keys]},
+                            index=pd.Index(keys, name=by),
+                            columns=['count', 'min', 'median', 'max'])
+
+    def box_stats(self, by, order=None, whis=1.5):
+        '''Returns a list of `bxp` statistics, one per `by` group'''
+        groups = self.groups([by])
+        return [sketch_boxstats(groups[key], key, whis)
+                for key in (order or sorted(groups)) if key in groups]
+
+    def medians(self):
+        '''Returns sketch estimates of the table
+        `groupby(['Embarked', 'Pclass'])['Fare'].median().unstack(level=1)`
+        with the ports in the order the Titanic stopped at them. They
+        are exact only while a group has fewer fares than the sketch holds'''
+        groups = self.groups(['Embarked', 'Pclass'])
+        medians = pd.Series({key: summary.quantile(0.5) for key, summary in groups.items()})
+        medians.index.names = ['Embarked', 'Pclass']
+        return medians.unstack(level=1).reindex(features.PORT_ORDER)
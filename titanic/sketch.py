@@ -0,0 +1,161 @@
+'''Mergeable summaries of a numeric column that never hold it all
+
+`KLLSketch` answers quantile questions within a configurable rank
+error, and `BinCounts` keeps exact fixed-width histogram counts.
+Both can be built on separate pieces of the data and merged later.
+'''
+
+import math
+
+import numpy as np
+
+# Shrink factor between the capacities of neighbouring levels
+LEVEL_DECAY = 2 / 3
+
+
+def k_for_error(error):
+    '''Returns the KLL `k` that keeps rank error around `error`
+    (as a fraction of the item count)'''
+    return max(8, int(math.ceil(1.65 / error)))
+
+
+class KLLSketch(object):
+    '''Approximate quantiles in the style of Karnin, Lang and Liberty
+
+    Items live in levels. An item on level h stands for 2**h of the
+    original values. When a level fills up it is sorted and every
+    other item moves up a level, halving its size.
+    '''
+
+    def __init__(self, error=0.01, seed=None):
+        self.k = k_for_error(error)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.random = np.random.RandomState(seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * LEVEL_DECAY ** depth)))
+
+    def update(self, values):
+        '''Adds an array of values, skipping missing ones'''
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.compress()
+        return self
+
+    def merge(self, other):
+        '''Folds another sketch into this one'''
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+        return self
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0)) # Also raises every capacity below
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0] # An odd item out stays put
+                pairs = items[:len(items) - len(keep)]
+                offset = self.random.randint(2)                   # Unbiased pick from each pair
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], pairs[offset::2]])
+                self.levels[level] = keep
+                level = 0 # Capacities may have changed, so check from the bottom again
+            else:
+                level += 1
+
+    def weighted_items(self):
+        '''Returns all retained items sorted, with their weights'''
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='mergesort')
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        '''Returns the approximate `q` quantile(s)
+
+        With every item still at weight one this is exactly what
+        `Series.quantile` gives, linear interpolation included.
+        '''
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        values, weights = self.weighted_items()
+        ranks = np.cumsum(weights) - weights + (weights - 1) / 2 # Middle rank each item stands for
+        return np.interp(np.asarray(q) * (self.count - 1), ranks, values)
+
+
+class BinCounts(object):
+    '''Exact counts of values in fixed-width bins starting at zero
+
+    Values sitting right on a bin edge are also counted separately,
+    because `np.histogram` puts the very last edge in the last bin.
+    Values above `max_value` only add to `overflow`, so memory stays
+    at about `max_value / width` bins however large a stray value is.
+    '''
+
+    def __init__(self, width=10, max_value=10000):
+        self.width = width
+        self.max_value = max_value
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.edge_counts = np.zeros(0, dtype=np.int64)
+        self.overflow = 0 # Values above max_value
+
+    @staticmethod
+    def grow(counts, extra):
+        if len(extra) > len(counts):
+            counts = np.concatenate([counts, np.zeros(len(extra) - len(counts), dtype=np.int64)])
+        counts[:len(extra)] += extra
+        return counts
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[values >= 0] # Also drops NaN
+        above = values > self.max_value
+        self.overflow += int(above.sum())
+        values = values[~above]
+        bins = np.floor(values / self.width).astype(np.int64)
+        self.counts = self.grow(self.counts, np.bincount(bins))
+        self.edge_counts = self.grow(self.edge_counts,
+                                     np.bincount(bins[values == bins * self.width]))
+        return self
+
+    def merge(self, other):
+        if (other.width, other.max_value) != (self.width, self.max_value):
+            raise ValueError("Can't merge BinCounts with different widths or maximums")
+        self.counts = self.grow(self.counts, other.counts)
+        self.edge_counts = self.grow(self.edge_counts, other.edge_counts)
+        self.overflow += other.overflow
+        return self
+
+    def histogram(self, upper):
+        '''Returns the same (counts, edges) as `np.histogram` of the
+        values below `upper` with `bins=np.arange(0, upper, width)`,
+        as long as the last of those edges is at most `max_value`'''
+        edges = np.arange(0, upper, self.width)
+        if self.overflow and len(edges) and edges[-1] > self.max_value:
+            raise ValueError("Histogram edge {} is above max_value={}; counts there "
+                             "were only kept as overflow".format(edges[-1], self.max_value))
+        size = max(len(edges) - 1, 0)
+        counts = np.zeros(size, dtype=np.int64)
+        known = self.counts[:size]
+        counts[:len(known)] = known
+        if size and size < len(self.edge_counts):
+            counts[-1] += self.edge_counts[size] # Values equal to the last edge
+        return counts, edges
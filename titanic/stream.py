@@ -0,0 +1,176 @@
+'''Chunked loading of titanic-data.csv shaped manifests
+
+`read_chunks` parses the file a piece at a time with a compact dtype
+schema and `StreamingSummary` keeps running totals of what the
+analysis needs, so memory use doesn't grow with the size of the file.
+'''
+
+import numpy as np
+import pandas as pd
+
+from . import features
+from .sketch import BinCounts, KLLSketch
+from .survival import counts_frame, survival_table
+
+# Smallest types that hold every value in the manifest
+DTYPES = {
+    'PassengerId': np.int32,
+    'Survived': np.int8,
+    'Pclass': np.int8,
+    'Sex': 'category',
+    'Age': np.float32,
+    'SibSp': np.int8,
+    'Parch': np.int8,
+    'Fare': np.float32,
+    'Embarked': 'category',
+}
+
+SURVIVAL_GROUPS = ['Sex', 'MWCh', 'Pclass', 'Deck']
+
+
+def read_chunks(path, chunksize=100000, usecols=None, dtypes=DTYPES):
+    '''Yields DataFrames of at most `chunksize` rows from `path`'''
+    dtype = dtypes if usecols is None else {column: dtypes[column]
+                                            for column in usecols if column in dtypes}
+    return pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize)
+
+
+def with_derived(chunk, columns=('MWCh', 'Deck')):
+    '''Adds the MWCh and Deck columns used by the survival tables,
+    unless they are already there. `columns` picks which to add'''
+    derived = {}
+    if 'MWCh' in columns and 'MWCh' not in chunk:
+        derived['MWCh'] = features.mwch
+    if 'Deck' in columns and 'Deck' not in chunk:
+        derived['Deck'] = lambda x: features.deck(x['Cabin'])
+    return chunk.assign(**derived)
+
+
+class FareSummary(object):
+    '''Running count, mean, spread, range and quantiles of fares
+
+    Partial summaries combine with `merge`, using Chan et al.'s
+    update for the variance so the numbers stay stable. Quantiles
+    come from a KLL sketch with rank error about `error`, and the
+    histogram only bins fares up to `bin_max`.
+    '''
+
+    def __init__(self, error=0.001, bin_width=10, seed=None, bin_max=10000):
+        self.sketch = KLLSketch(error, seed)
+        self.bins = BinCounts(bin_width, bin_max)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared differences from the mean
+
+    @property
+    def min(self):
+        return self.sketch.min
+
+    @property
+    def max(self):
+        return self.sketch.max
+
+    def add_moments(self, count, mean, m2):
+        if count:
+            total = self.count + count
+            delta = mean - self.mean
+            self.mean += delta * count / total
+            self.m2 += m2 + delta ** 2 * self.count * count / total
+            self.count = total
+
+    def update(self, fares):
+        values = np.asarray(fares, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.sketch.update(values)
+        self.bins.update(values)
+        if len(values):
+            mean = values.mean()
+            self.add_moments(len(values), mean, ((values - mean) ** 2).sum())
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.bins.merge(other.bins)
+        self.add_moments(other.count, other.mean, other.m2)
+        return self
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def describe(self):
+        '''Returns the same statistics as `fares.describe()`'''
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        quartiles = list(self.quantile([0.25, 0.5, 0.75]))
+        return pd.Series([self.count, self.mean, std, self.min] + quartiles + [self.max],
+                         index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+                         name='Fare')
+
+    def bottom_histogram(self, fraction=0.90):
+        '''Returns the (counts, edges) of the fares below the
+        `fraction` quantile, binned like the notebook's histogram'''
+        return self.bins.histogram(self.quantile(fraction))
+
+
+class SurvivalCounts(object):
+    '''Running totals of missing values and survivors'''
+
+    def __init__(self, groups=SURVIVAL_GROUPS):
+        self.groups = list(groups)
+        self.rows = 0
+        self.nulls = None
+        self.counts = {} # (group, value) -> [passengers, survivors]
+
+    def add_nulls(self, chunk):
+        self.rows += len(chunk)
+        nulls = chunk.isnull().sum()
+        self.nulls = nulls if self.nulls is None else self.nulls.add(nulls, fill_value=0)
+
+    def add_survival(self, chunk):
+        counts = survival_table(with_derived(chunk), self.groups)
+        for key, count, survivors in zip(counts.index, counts['Count'], counts['Survivors']):
+            totals = self.counts.setdefault(key, [0, 0])
+            totals[0] += int(count)
+            totals[1] += int(survivors)
+
+    def null_counts(self):
+        '''Returns the same numbers as `titanic_data.isnull().sum()`'''
+        if self.nulls is None: # Nothing seen yet
+            return pd.Series([], dtype=np.int64)
+        return self.nulls.astype(np.int64)
+
+    def survival(self):
+        '''Returns the survival table of everything seen so far'''
+        pieces = []
+        for group in self.groups:
+            values = sorted(value for key, value in self.counts if key == group)
+            counts = np.array([self.counts[group, value] for value in values],
+                              dtype=np.int64).reshape(-1, 2)
+            pieces.append(counts_frame(group, values, counts[:, 0], counts[:, 1]))
+        return pd.concat(pieces)
+
+    def percent_survived(self, group):
+        '''Returns what `percent_survived(group, df)` would give'''
+        return self.survival().loc[group, 'Percent']
+
+
+class StreamingSummary(SurvivalCounts):
+    '''Running totals of missing values, survivors and fares'''
+
+    def __init__(self, groups=SURVIVAL_GROUPS):
+        super(StreamingSummary, self).__init__(groups)
+        self.fares = FareSummary()
+
+    def update(self, chunk):
+        '''Folds one chunk of raw passenger rows into the totals'''
+        self.add_nulls(chunk)
+        self.add_survival(chunk)
+        self.fares.update(chunk['Fare'])
+        return self
+
+
+def summarize_csv(path, chunksize=100000, groups=SURVIVAL_GROUPS):
+    '''Returns a `StreamingSummary` of the whole file at `path`'''
+    summary = StreamingSummary(groups)
+    for chunk in read_chunks(path, chunksize):
+        summary.update(chunk)
+    return summary
@@ -0,0 +1,55 @@
+'''Survival rates of groups of passengers
+
+`percent_survived` is the notebook's one-group-at-a-time crosstab.
+`survival_table` works out the rate, passenger count and survivor
+count for several groupings in a single pass over the data.
+'''
+
+import numpy as np
+import pandas as pd
+
+
+def percent_survived(group, df):
+    '''Returns a series of percentages of survivors
+    of each `group`
+    '''
+    return (pd.crosstab(df[group], df['Survived'],
+                        normalize=0) # Make conditional frequency table
+              .loc[:, 1])            # Get percentage of just the survivors ('Survived' == 1)
+
+
+def group_counts(codes, survived, size):
+    '''Returns passenger and survivor counts for each of
+    `size` integer group `codes`. Missing values (-1) are skipped
+    '''
+    known = codes >= 0
+    count = np.bincount(codes[known], minlength=size)
+    survivors = np.bincount(codes[known], weights=survived[known], minlength=size)
+    return count, survivors.astype(np.int64)
+
+
+def counts_frame(group, values, count, survivors):
+    '''Returns one group's slice of a survival table'''
+    return pd.DataFrame({'Count': count,
+                         'Survivors': survivors,
+                         'Percent': survivors / count},
+                        index=pd.MultiIndex.from_arrays(
+                            [[group] * len(values), np.asarray(values, dtype=object)],
+                            names=['Group', 'Value']),
+                        columns=['Count', 'Survivors', 'Percent'])
+
+
+def survival_table(df, groups):
+    '''Returns a tidy table of survivors for every column in `groups`
+
+    The table is indexed by (group, value) and has the columns Count,
+    Survivors and Percent, so `table.loc['Sex', 'Percent']` matches
+    `percent_survived('Sex', df)` and plots straight away.
+    '''
+    survived = np.asarray(df['Survived'], dtype=np.int64) # Only convert the outcome once
+    pieces = []
+    for group in groups:
+        codes, values = pd.factorize(df[group], sort=True) # Sorted like crosstab's index
+        count, survivors = group_counts(codes, survived, len(values))
+        pieces.append(counts_frame(group, values, count, survivors))
+    return pd.concat(pieces)